@@ -0,0 +1,120 @@
+import pandas as pd
+
+import db
+import load_data
+import queries
+
+
+# In-process backend of the reports, see DBManager(analytics=...).
+# Computes the results of the report statements of queries.REPORT_QUERIES with pandas from the sanitized
+# data (load_data.load_data, default or typed mode), without a database round trip:
+#   analytics = PandasAnalytics(load_data.load_data("weather_data_2020.csv"))
+#   analytics.fetch(queries.QUERY_04)
+# The results have the columns, types and (where the SQL orders them) row order of the SQL results.
+# Results of unordered statements come sorted by name. Correlations are NaN where they are undefined (a
+# constant column), where the database returns NULL.
+class PandasAnalytics:
+    def __init__(self, data):
+        data = db._widen(data)
+        dates = db._dates(data)
+        self.observation = pd.DataFrame(
+            {
+                "name": data["place"].astype(str).to_numpy(),
+                "latitude": data["latitude"].to_numpy(),
+                "year": dates.dt.year.to_numpy("int64"),
+                "month": dates.dt.month.to_numpy("int64"),
+                "rain": _numeric(data["rain"]),
+                "snow": _numeric(data["snow"]),
+                "air_temperature": _numeric(data["air_temperature"]),
+                "lowest": _numeric(data["lowest_temperature"]),
+                "highest": _numeric(data["highest_temperature"]),
+            }
+        )
+        self.monthly_summary = self._monthly_summary()
+        self._reports = {
+            queries.QUERY_01: self.query_01,
+            queries.QUERY_02_OVERALL: self.query_02_overall,
+            queries.QUERY_02_BY_PLACE: self.query_02_by_place,
+            queries.QUERY_03: self.query_03,
+            queries.QUERY_04: self.query_04,
+            queries.QUERY_05: self.query_05,
+        }
+
+    # Result of a report statement of queries.REPORT_QUERIES (the backend interface used by DBManager)
+    def fetch(self, query, parameters=None):
+        return self._reports[query]()
+
+    # The monthly_summary table (see DBManager.refresh_monthly_summary), by place name. Like SQL's SUM,
+    # sums over no values are NaN (min_count=1).
+    def _monthly_summary(self):
+        observation = self.observation
+        snowy = observation["snow"] > 0
+        frame = observation[["name", "year", "month"]].assign(
+            snowy_days=snowy,
+            total_snow=observation["snow"].where(snowy),
+            rainy_days=observation["rain"] > 0,
+            air_temperature_sum=observation["air_temperature"],
+            air_temperature_count=observation["air_temperature"].notna(),
+        )
+        return frame.groupby(["name", "year", "month"]).sum(min_count=1).reset_index()
+
+    # 1. See queries.QUERY_01
+    def query_01(self):
+        summary = self.monthly_summary
+        place_snow = summary.groupby("name")["snowy_days"].sum()
+        place_snow = place_snow[place_snow > 0]
+        month_snow = summary.groupby(["name", "month"])[["total_snow", "snowy_days"]].sum(min_count=1)
+        month_snow = month_snow[month_snow["snowy_days"] > 0]
+        # idxmax and idxmin return the first of tied labels, which are sorted like the tie-break of the SQL
+        most, least = place_snow.idxmax(), place_snow.idxmin()
+        most_month = month_snow.loc[most, "total_snow"].idxmax()
+        least_month = month_snow.loc[least, "snowy_days"].idxmax()
+        return pd.DataFrame(
+            {
+                "most_name": [most],
+                "most_snowy_days": [int(place_snow[most])],
+                "most_month": [int(most_month)],
+                "most_total_snow": [float(month_snow.loc[(most, most_month), "total_snow"])],
+                "least_name": [least],
+                "least_snowy_days": [int(place_snow[least])],
+                "least_month": [int(least_month)],
+                "least_month_snowy_days": [int(month_snow.loc[(least, least_month), "snowy_days"])],
+            }
+        )
+
+    # 2. See queries.QUERY_02_OVERALL and QUERY_02_BY_PLACE
+    def query_02_overall(self):
+        temperature = self.observation.dropna(subset=["lowest", "highest"])
+        return pd.DataFrame({"correlation": [temperature["lowest"].corr(temperature["highest"])]})
+
+    def query_02_by_place(self):
+        temperature = self.observation.dropna(subset=["lowest", "highest"])
+        return _correlation(temperature, "lowest", "highest")
+
+    # 3. See queries.QUERY_03
+    def query_03(self):
+        observation = self.observation.dropna(subset=["air_temperature", "latitude"])
+        return _correlation(observation, "air_temperature", "latitude")
+
+    # 4. See queries.QUERY_04
+    def query_04(self):
+        rainy_days = self.monthly_summary.groupby(["name", "month"])["rainy_days"].sum()
+        return rainy_days[rainy_days > 0].astype("int64").reset_index()
+
+    # 5. See queries.QUERY_05
+    def query_05(self):
+        sums = self.monthly_summary.groupby(["name", "month"])[["air_temperature_sum", "air_temperature_count"]].sum()
+        sums = sums[sums["air_temperature_count"] > 0]
+        average = sums["air_temperature_sum"] / sums["air_temperature_count"]
+        return average.rename("avg_temperature").reset_index()
+
+
+# Measurement column as float64 with NaN for the "NULL" strings of the default load_data mode
+def _numeric(values):
+    return pd.to_numeric(load_data.nulls(values)).astype("float64").to_numpy()
+
+
+# Sample correlation of two columns per place name, NaN where a column is constant
+def _correlation(frame, x, y):
+    correlation = frame.groupby("name")[[x, y]].corr().xs(x, level=1)[y]
+    return correlation.rename("correlation").reset_index()
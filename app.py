@@ -1,26 +1,183 @@
-import db
-import load_data
-
-# Load the data from the CSV file
-weather_data = load_data.load_data("weather_data_2020.csv")
-
-# Initialize the database connection
-db_manager = db.DBManager(weather_data)
-db_manager.init_db_connection()
-
-# Insert the data into the database
-db_manager.insert_place()
-db_manager.insert_observation()
-db_manager.insert_temperature()
-
-# Queries
-db_manager.query_01()
-print("\n")
-db_manager.query_02()
-print("\n")
-db_manager.query_03()
-print("\n")
-db_manager.query_04()
-print("\n")
-db_manager.query_05()
-print("\n")
+import argparse
+import contextlib
+
+# Command line interface of the weather database:
+#   python app.py                load weather_data_2020.csv and run all the reports (the original app)
+#   python app.py load [FILE]    (re)create the database and load a CSV file (--resume: checkpointed, see pipeline)
+#   python app.py query N        run report N (1-5) on the loaded database (--backend pandas: from a CSV file)
+#   python app.py plot           render the charts of reports 4 and 5 headless into a directory
+#   python app.py bench          time every stage on synthetic data (see benchmark.run_suite)
+# pandas, SQLAlchemy and matplotlib are imported inside the commands that need them, so that
+# e.g. python app.py --help does not pay for them (see benchmark.check_startup).
+
+# Directory of the sanitized-data cache (see load_data.load_data)
+CACHE_DIR = ".sanitized_cache"
+
+# File the rows failing validation are written to by the load command (see validate.validate_data)
+REJECT_FILE = "weather_data_rejects.csv"
+
+
+# Load a CSV file into the database and return the DBManager
+def load(args):
+    import db
+    import load_data
+    import validate
+
+    if args.resume:
+        import pipeline
+
+        # Load through the checkpointed pipeline, continuing an interrupted load of the same file
+        db_manager = pipeline.run_pipeline(
+            args.file,
+            args.dsn,
+            args.typed,
+            cache_dir=CACHE_DIR,
+            reject_path=args.reject_file,
+            partition_by=args.partition_by,
+            known_places_only=args.known_places,
+        )
+        finish_load(db_manager)
+        return db_manager
+
+    # Load the data from the CSV file (repeat runs on the same file read the sanitized data from the cache)
+    try:
+        weather_data, rejects = load_data.load_checked(args.file, args.typed, CACHE_DIR)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"Loading {args.file} failed: {e}")
+
+    # Initialize the database connection
+    db_manager = db.DBManager(None, args.dsn)
+    db_manager.init_db_connection(args.incremental, args.partition_by)
+
+    # Set the rows failing validation aside, so that bad input does not abort the load halfway
+    # (--known-places: also the rows of stations that are not stored yet)
+    known_places = db_manager.place_codes() if args.known_places else None
+    db_manager.data, _ = validate.validate_data(weather_data, known_places, args.reject_file, rejects)
+
+    # Insert the data into the database (bulk_insert streams Observation and Temperature with COPY,
+    # insert_observation() and insert_temperature() are the original one-row-per-transaction path)
+    if args.incremental:
+        db_manager.insert_incremental()
+    elif args.elt:
+        db_manager.elt_insert()
+    else:
+        db_manager.insert_place()
+        db_manager.bulk_insert()
+    finish_load(db_manager)
+    return db_manager
+
+
+# Tables written by a load (see load)
+LOADED_TABLES = ["place", "observation", "temperature", "monthly_summary", "correlation_stats", "load_checkpoint"]
+
+
+# Index a newly created database (create_indexes, followed by a VACUUM ANALYZE of the whole database); a load
+# into an existing one (--incremental, --resume) already has the indexes and only analyzes the tables it wrote
+def finish_load(db_manager):
+    if db_manager.created:
+        db_manager.create_indexes()
+    else:
+        db_manager.analyze(LOADED_TABLES)
+
+
+# Open the database loaded by an earlier run
+def connect(args, plot_dir=None):
+    import db
+
+    db_manager = db.DBManager(None, args.dsn, plot_dir=plot_dir)
+    try:
+        db_manager.open_db_connection()
+    except ValueError as e:
+        raise SystemExit(f"{e}; load it with python app.py load")
+    return db_manager
+
+
+# Compute the reports in-process from a CSV file (see analytics.PandasAnalytics), without a database. The
+# rows failing validation are left out, as the load command does.
+def offline(args, plot_dir=None):
+    import analytics
+    import db
+    import load_data
+    import validate
+
+    try:
+        weather_data, rejects = load_data.load_checked(args.file, args.typed, CACHE_DIR)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"Loading {args.file} failed: {e}")
+    weather_data, _ = validate.validate_data(weather_data, rejects=rejects)
+    return db.DBManager(weather_data, args.dsn, plot_dir=plot_dir, analytics=analytics.PandasAnalytics(weather_data))
+
+
+# Run some of the reports on one pooled connection
+def run_queries(db_manager, numbers):
+    with db_manager.connection() if db_manager.analytics is None else contextlib.nullcontext():
+        for number in numbers:
+            getattr(db_manager, f"query_{number:02d}")()
+            print("\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load the weather data into PostgreSQL and report on it")
+    parser.add_argument("--dsn", default=None, help="database URL (default: WEATHERDATA_DSN or db.DEFAULT_DSN)")
+    # Without a command, load weather_data_2020.csv as the load command would and run all the reports
+    parser.set_defaults(
+        file="weather_data_2020.csv",
+        typed=False,
+        incremental=False,
+        partition_by=None,
+        elt=False,
+        reject_file=REJECT_FILE,
+        resume=False,
+        known_places=False,
+    )
+    commands = parser.add_subparsers(dest="command")
+    load_command = commands.add_parser("load", help="(re)create the database and load a CSV file")
+    load_command.add_argument("file", nargs="?", default="weather_data_2020.csv")
+    load_command.add_argument("--typed", action="store_true", help="load with compact column types")
+    load_command.add_argument("--incremental", action="store_true", help="keep the database and add newer rows")
+    load_command.add_argument("--partition-by", choices=["year", "month"], default=None)
+    load_command.add_argument("--elt", action="store_true", help="load through a staging table on the server")
+    load_command.add_argument("--reject-file", default=REJECT_FILE, help="file the rows failing validation go to")
+    load_command.add_argument(
+        "--resume", action="store_true", help="keep the database and continue an interrupted load of the file"
+    )
+    load_command.add_argument(
+        "--known-places",
+        action="store_true",
+        help="with --incremental or --resume: only load the stations already in the database",
+    )
+    query_command = commands.add_parser("query", help="run one report on the loaded database")
+    query_command.add_argument("number", type=int, choices=range(1, 6))
+    query_command.add_argument("--plot-dir", default=None, help="render the charts headless into this directory")
+    query_command.add_argument(
+        "--backend", choices=["sql", "pandas"], default="sql", help="pandas: compute the report from --file in-process"
+    )
+    query_command.add_argument("--file", default="weather_data_2020.csv")
+    query_command.add_argument("--typed", action="store_true")
+    plot_command = commands.add_parser("plot", help="render the charts of reports 4 and 5 headless")
+    plot_command.add_argument("--output-dir", default="charts")
+    bench_command = commands.add_parser("bench", help="time every stage on synthetic data")
+    bench_command.add_argument("--stations", type=int, default=4)
+    bench_command.add_argument("--years", type=int, default=1)
+    bench_command.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args(argv)
+    if args.known_places and not (args.incremental or args.resume):
+        parser.error("--known-places needs --incremental or --resume")
+
+    if args.command == "load":
+        load(args)
+    elif args.command == "query":
+        db_manager = connect(args, args.plot_dir) if args.backend == "sql" else offline(args, args.plot_dir)
+        run_queries(db_manager, [args.number])
+    elif args.command == "plot":
+        run_queries(connect(args, args.output_dir), [4, 5])
+    elif args.command == "bench":
+        import benchmark
+
+        benchmark.run_suite(args.stations, args.years, args.output, args.dsn)
+    else:
+        run_queries(load(args), [1, 2, 3, 4, 5])
+
+
+if __name__ == "__main__":
+    main()
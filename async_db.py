@@ -0,0 +1,140 @@
+import asyncio
+
+import pandas as pd
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.sql import text
+
+import db
+import queries
+import reports
+
+
+# asyncio variant of db.DBManager on SQLAlchemy's async engine with asyncpg.
+# The schema and the maintenance of monthly_summary and correlation_stats are delegated to a db.DBManager
+# (run in a thread), the data is copied with asyncpg and the report queries run concurrently on the async pool:
+#   manager = AsyncDBManager(weather_data)
+#   await manager.init_db_connection()
+#   await manager.insert_place()
+#   await asyncio.gather(manager.insert_observation(), manager.insert_temperature())
+#   await manager.run_reports()
+class AsyncDBManager:
+    def __init__(self, data, dsn=None, pool_settings=None, plot_dir=None):
+        self.engine = None
+        self.data: pd.DataFrame = data
+        self.manager = db.DBManager(data, dsn, {"pool_size": 1, "max_overflow": 1})
+        self.dsn = self.manager.dsn.set(drivername="postgresql+asyncpg")
+        self.pool_settings = {**db.POOL_SETTINGS, **(pool_settings or {})}
+        # See db.DBManager(plot_dir=...)
+        self.plot_dir = plot_dir
+
+    # (Re)create the database (see db.DBManager.init_db_connection) and open the async engine
+    async def init_db_connection(self, incremental=False, partition_by=None):
+        if self.engine is not None:
+            await self.engine.dispose()
+        await asyncio.to_thread(self.manager.init_db_connection, incremental, partition_by)
+        self.engine = create_async_engine(self.dsn, **self.pool_settings)
+
+    async def close(self):
+        await self.engine.dispose()
+        self.manager.engine.dispose()
+
+    # Insert the data for Place, Observation, and Temperature tables with COPY
+    async def insert_place(self):
+        places = self.data[["place", "place_code", "latitude", "longitude"]].drop_duplicates()
+        frame = pd.DataFrame(
+            {
+                "code": places["place_code"].astype(str),
+                "name": places["place"],
+                "latitude": places["latitude"],
+                "longitude": places["longitude"],
+            }
+        )
+        await self._copy_frame("place", frame)
+
+    async def insert_observation(self):
+        await self._copy_frame("observation", self.manager.observation_frame(self.data))
+        await asyncio.to_thread(self.manager.refresh_monthly_summary, self.data)
+        await asyncio.to_thread(self.manager.add_correlation_stats, "observation", self.data)
+
+    async def insert_temperature(self):
+        await self._copy_frame("temperature", self.manager.temperature_frame(self.data))
+        await asyncio.to_thread(self.manager.add_correlation_stats, "temperature", self.data)
+
+    # Copy a frame into a table with asyncpg's binary COPY
+    async def _copy_frame(self, table, frame):
+        if "date" in frame:
+            await asyncio.to_thread(self.manager.ensure_partitions, table, frame["date"])
+            frame = frame.assign(date=frame["date"].dt.date)
+        records = list(frame.astype(object).where(frame.notna(), None).itertuples(index=False, name=None))
+        async with self.engine.connect() as connection:
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                table, records=records, columns=list(frame.columns)
+            )
+            await connection.execute(text("UPDATE data_version SET version = version + 1;"))
+            await connection.commit()
+        print(f"Copied {len(records)} rows into {table}")
+
+    async def _fetch(self, query, parameters=None):
+        async with self.engine.connect() as connection:
+            res = await connection.execute(query, parameters)
+            return pd.DataFrame(res.fetchall(), columns=list(res.keys()))
+
+    # QUERIES (see db.DBManager.query_01 ... query_05)
+    async def query_01(self):
+        reports.show_query_01(await self._fetch(queries.QUERY_01))
+
+    async def query_02(self):
+        reports.show_query_02(
+            *await asyncio.gather(self._fetch(queries.QUERY_02_OVERALL), self._fetch(queries.QUERY_02_BY_PLACE))
+        )
+
+    async def query_03(self):
+        reports.show_query_03(await self._fetch(queries.QUERY_03))
+
+    async def query_04(self):
+        reports.show_query_04(await self._fetch(queries.QUERY_04), self.plot_dir)
+
+    async def query_05(self):
+        reports.show_query_05(await self._fetch(queries.QUERY_05), self.plot_dir)
+
+    # Run the statements of all five reports concurrently, then print and plot the results in order
+    async def run_reports(self):
+        results = await asyncio.gather(
+            self._fetch(queries.QUERY_01),
+            self._fetch(queries.QUERY_02_OVERALL),
+            self._fetch(queries.QUERY_02_BY_PLACE),
+            self._fetch(queries.QUERY_03),
+            self._fetch(queries.QUERY_04),
+            self._fetch(queries.QUERY_05),
+        )
+        query_01, query_02_overall, query_02_by_place, query_03, query_04, query_05 = results
+        reports.show_query_01(query_01)
+        print("\n")
+        reports.show_query_02(query_02_overall, query_02_by_place)
+        print("\n")
+        reports.show_query_03(query_03)
+        print("\n")
+        reports.show_query_04(query_04, self.plot_dir)
+        print("\n")
+        reports.show_query_05(query_05, self.plot_dir)
+        print("\n")
+        return results
+
+
+async def main(file_path="weather_data_2020.csv"):
+    import load_data
+    import validate
+
+    weather_data, rejects = load_data.load_checked(file_path)
+    weather_data, _ = validate.validate_data(weather_data, rejects=rejects)
+    manager = AsyncDBManager(weather_data)
+    await manager.init_db_connection()
+    await manager.insert_place()
+    await asyncio.gather(manager.insert_observation(), manager.insert_temperature())
+    await manager.run_reports()
+    await manager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
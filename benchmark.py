@@ -0,0 +1,331 @@
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import db
+import load_data
+
+# Columns of the raw weather CSV files read by load_data
+CSV_COLUMNS = [
+    "year", "month", "day", "time", "timezone", "rain", "snow", "air_temperature", "ground_temperature",
+    "highest_temperature", "lowest_temperature", "place", "place_code", "latitude", "longitude",
+]
+
+
+# Import-time budget (in seconds) of python app.py --help, see check_startup
+STARTUP_BUDGET_SECONDS = 0.1
+
+# Modules the CLI must not import before a command needs them
+HEAVY_MODULES = ["pandas", "sqlalchemy", "matplotlib", "numpy"]
+
+
+# Run a load step and return the rows per second it achieved
+def timed(step, rows):
+    start_time = time.perf_counter()
+    step()
+    elapsed = time.perf_counter() - start_time
+    return elapsed, rows / max(elapsed, 1e-9)
+
+
+# Compare the rows/sec of the per-row INSERT path with the COPY bulk load path
+def compare_insert_paths(file_path, dsn=None):
+    weather_data = load_data.load_data(file_path)
+    rows = 2 * len(weather_data)
+    results = {}
+
+    db_manager = db.DBManager(weather_data, dsn)
+    db_manager.init_db_connection()
+    db_manager.insert_place()
+    results["per-row insert"] = timed(
+        lambda: (db_manager.insert_observation(), db_manager.insert_temperature()), rows
+    )
+
+    db_manager.init_db_connection()
+    db_manager.insert_place()
+    results["COPY"] = timed(db_manager.bulk_insert, rows)
+
+    db_manager.init_db_connection()
+    db_manager.insert_place()
+    results["COPY, deferred constraints"] = timed(
+        lambda: db_manager.bulk_insert(defer_constraints=True), rows
+    )
+
+    db_manager.init_db_connection()
+    results["ELT (staging table)"] = timed(db_manager.elt_insert, rows)
+
+    print(f"Observation + Temperature rows loaded per run: {rows}")
+    for name, (elapsed, rows_per_second) in results.items():
+        print(f"{name:<28} {elapsed:8.2f}s {rows_per_second:12.0f} rows/s")
+    return results
+
+
+# Compare the EXPLAIN (ANALYZE, BUFFERS) timings of the report statements without and with the indexes
+# of db.INDEXES. The plans are appended to output_path as JSON lines.
+def compare_indexes(file_path, output_path="explain.jsonl", dsn=None):
+    weather_data = load_data.load_data(file_path)
+    db_manager = db.DBManager(weather_data, dsn)
+    db_manager.init_db_connection()
+    db_manager.insert_place()
+    db_manager.bulk_insert()
+
+    db_manager.drop_indexes()
+    before = db_manager.explain_reports("without indexes", output_path)
+    db_manager.create_indexes()
+    after = db_manager.explain_reports("with indexes", output_path)
+
+    print(f"{'statement':<12} {'without':>12} {'with':>12}")
+    for old, new in zip(before, after):
+        print(f"{old['query']:<12} {old['execution_ms']:10.2f}ms {new['execution_ms']:10.2f}ms")
+    return before, after
+
+
+# Compare the row-based fetch path with the columnar one (COPY TO + Arrow) on the full Observation table
+def compare_fetch(file_path, dsn=None):
+    weather_data = load_data.load_data(file_path, typed=True)
+    db_manager = db.DBManager(weather_data, dsn)
+    db_manager.init_db_connection()
+    db_manager.insert_place()
+    db_manager.bulk_insert()
+    query = db.text("SELECT * FROM observation")
+
+    results = {}
+    for name, columnar in [("rows", False), ("columnar", True)]:
+        db_manager.columnar = columnar
+        results[name] = timed(lambda: db_manager.fetch(query), len(weather_data))
+    for name, (elapsed, rows_per_second) in results.items():
+        print(f"{name:<10} {elapsed:8.2f}s {rows_per_second:12.0f} rows/s")
+    return results
+
+
+# Compare the memory footprint of the data loaded by load_data in the default mode ("NULL" strings in
+# object columns) and in the typed mode
+def compare_memory(file_path):
+    results = {}
+    for name, typed in [("default", False), ("typed", True)]:
+        with contextlib.redirect_stdout(io.StringIO()):
+            weather_data = load_data.load_data(file_path, typed)
+        results[name] = int(weather_data.memory_usage(deep=True).sum())
+    for name, size in results.items():
+        print(f"{name:<8} {size / 2**20:10.1f} MiB")
+    print(f"{'ratio':<8} {results['default'] / results['typed']:10.1f}x")
+    return results
+
+
+# Write a synthetic CSV file in the format of weather_data_2020.csv: for every station and day a 00:00 row
+# (rain and snow -1 when there was none) and, on about half of the days, a 06:00 row holding only the
+# ground temperature. About missing_rate of the measured values are left empty.
+# stations x years x ~550 lines are written, one station at a time.
+def generate_weather_csv(file_path, stations=4, years=1, start_year=2000, missing_rate=0.02, seed=0):
+    rng = np.random.default_rng(seed)
+    days = pd.date_range(f"{start_year}-01-01", f"{start_year + years - 1}-12-31", freq="D")
+    season = -np.cos(2 * np.pi * (days.dayofyear.to_numpy() - 15) / 365.25)
+    lines = 0
+    with open(file_path, "w", encoding="utf-8") as file:
+        file.write(",".join(CSV_COLUMNS) + "\n")
+        for station in range(stations):
+            latitude = 60 + 10 * rng.random()
+            longitude = 20 + 11 * rng.random()
+            air_temperature = 2 - 1.2 * (latitude - 60) + 11 * season + rng.normal(0, 3, len(days))
+            rain = np.where(rng.random(len(days)) < 0.5, -1, rng.exponential(3, len(days)).round(1))
+            snow = np.where(air_temperature < 0, rng.integers(1, 80, len(days)), -1)
+            midnight = pd.DataFrame(
+                {
+                    "year": days.year,
+                    "month": days.month,
+                    "day": days.day,
+                    "time": "00:00",
+                    "timezone": "UTC",
+                    "rain": _with_gaps(rng, rain, missing_rate),
+                    "snow": _with_gaps(rng, snow.astype(float), missing_rate),
+                    "air_temperature": _with_gaps(rng, air_temperature.round(1), missing_rate),
+                    "ground_temperature": np.nan,
+                    "highest_temperature": _with_gaps(rng, (air_temperature + rng.uniform(0, 5, len(days))).round(1), missing_rate),
+                    "lowest_temperature": _with_gaps(rng, (air_temperature - rng.uniform(0, 5, len(days))).round(1), missing_rate),
+                }
+            )
+            morning = midnight[rng.random(len(days)) < 0.5][["year", "month", "day"]].assign(time="06:00", timezone="UTC")
+            morning["ground_temperature"] = _with_gaps(
+                rng, (air_temperature[morning.index] - 1 + rng.normal(0, 2, len(morning))).round(1), missing_rate
+            )
+            rows = pd.concat([midnight, morning]).sort_index(kind="stable").reindex(columns=CSV_COLUMNS)
+            rows["place"] = f"Station {station}"
+            rows["place_code"] = 200000 + station
+            rows["latitude"] = round(latitude, 5)
+            rows["longitude"] = round(longitude, 5)
+            rows.to_csv(file, header=False, index=False, float_format="%.10g", lineterminator="\n")
+            lines += len(rows)
+    return lines
+
+
+# Replace a share of the values by NaN (an empty field in the CSV file)
+def _with_gaps(rng, values, missing_rate):
+    return np.where(rng.random(len(values)) < missing_rate, np.nan, values)
+
+
+# Time the stages of a run on a synthetic data set of stations x years and write the results as JSON.
+# The database of dsn (default: weatherdata_bench on the server of db.DEFAULT_DSN) is recreated for the
+# run and dropped at the end. With per_row, the original one-row-per-transaction inserts are timed too
+# (they take hours on large data sets); the COPY loaders are always timed.
+def run_suite(stations=4, years=1, output_path="bench_results.json", dsn=None, per_row=False, seed=0):
+    import matplotlib
+
+    matplotlib.use("Agg")
+    dsn = dsn or os.environ.get("WEATHERDATA_BENCH_DSN") or db.sqlalchemy.engine.make_url(
+        os.environ.get("WEATHERDATA_DSN", db.DEFAULT_DSN)
+    ).set(database="weatherdata_bench")
+    stages = []
+
+    def stage(name, step, rows=None):
+        start_time = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = step()
+        elapsed = time.perf_counter() - start_time
+        rows = rows(result) if callable(rows) else rows
+        stages.append(
+            {
+                "stage": name,
+                "seconds": elapsed,
+                "rows": rows,
+                "rows_per_second": None if rows is None else rows / max(elapsed, 1e-9),
+            }
+        )
+        print(f"{name:<22} {elapsed:10.3f}s" + ("" if rows is None else f" {rows:>10} rows"))
+        return result
+
+    workdir = tempfile.mkdtemp(prefix="weather_bench_")
+    file_path = os.path.join(workdir, "weather.csv")
+    current_dir = os.getcwd()
+    os.chdir(workdir)
+    try:
+        lines = stage("generate", lambda: generate_weather_csv(file_path, stations, years, seed=seed), lambda n: n)
+        weather_data = stage("load_data", lambda: load_data.load_data(file_path), lines)
+        rows = len(weather_data)
+
+        db_manager = db.DBManager(weather_data, dsn, plot_dir=os.path.join(workdir, "charts"))
+        if per_row:
+            stage("init_db_connection", db_manager.init_db_connection)
+            stage("insert_place", db_manager.insert_place, stations)
+            stage("insert_observation", db_manager.insert_observation, rows)
+            stage("insert_temperature", db_manager.insert_temperature, rows)
+        stage("init_db_connection", db_manager.init_db_connection)
+        stage("insert_place", db_manager.insert_place, stations)
+        stage("copy_observation", db_manager.copy_observation, rows)
+        stage("copy_temperature", db_manager.copy_temperature, rows)
+        stage("create_indexes", db_manager.create_indexes)
+        for query in ["query_01", "query_02", "query_03", "query_04", "query_05"]:
+            stage(query, getattr(db_manager, query))
+    finally:
+        os.chdir(current_dir)
+        if "db_manager" in locals() and db_manager.engine is not None:
+            db_manager.drop_database()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "stations": stations,
+        "years": years,
+        "csv_lines": lines,
+        "stages": stages,
+    }
+    with open(output_path, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {output_path}")
+    return results
+
+
+# Measure the imports of python app.py --help with python -X importtime. Returns the cumulative import time
+# of the top-level imports in seconds and the names of every imported module.
+def startup_imports():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "app.py", "--help"], capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    seconds = 0.0
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_time, cumulative, name = line[len("import time:"):].split("|")
+        imported.add(name.strip())
+        # Top-level imports are the ones that are not indented
+        if not name.startswith("  "):
+            seconds += int(cumulative) / 1e6
+    return seconds, imported
+
+
+# Check the startup_imports() of python app.py --help against the budget: the cumulative import time must
+# stay under budget seconds and none of HEAVY_MODULES may be imported (see tests/test_startup.py).
+# Returns True when the startup is within the budget.
+def check_startup(budget=STARTUP_BUDGET_SECONDS):
+    seconds, imported = startup_imports()
+    heavy = [module for module in HEAVY_MODULES if module in imported]
+    print(f"app.py --help imports: {seconds * 1000:.1f}ms (budget {budget * 1000:.0f}ms)")
+    if heavy:
+        print(f"Heavy modules imported at startup: {', '.join(heavy)}")
+    return seconds <= budget and not heavy
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks of the weather database")
+    parser.add_argument("--dsn", default=None, help="database URL (the database is dropped and recreated)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    suite = commands.add_parser("suite", help="time every stage on synthetic data")
+    suite.add_argument("--stations", type=int, default=4)
+    suite.add_argument("--years", type=int, default=1)
+    suite.add_argument("--per-row", action="store_true", help="also time the per-row insert path")
+    suite.add_argument("--output", default="bench_results.json")
+    generate = commands.add_parser("generate", help="write a synthetic weather CSV file")
+    generate.add_argument("output")
+    generate.add_argument("--stations", type=int, default=4)
+    generate.add_argument("--years", type=int, default=1)
+    generate.add_argument("--start-year", type=int, default=2000)
+    inserts = commands.add_parser("insert-paths", help="compare the per-row and COPY loaders")
+    inserts.add_argument("file", nargs="?", default="weather_data_2020.csv")
+    fetch = commands.add_parser("fetch", help="compare the row-based and columnar fetch paths")
+    fetch.add_argument("file", nargs="?", default="weather_data_2020.csv")
+    commands.add_parser("startup", help="check the import time of python app.py --help against the budget")
+    memory = commands.add_parser("memory", help="compare the memory footprint of the default and typed load_data")
+    memory.add_argument("file", nargs="?", default="weather_data_2020.csv")
+    indexes = commands.add_parser("indexes", help="compare report plans without and with indexes")
+    indexes.add_argument("file", nargs="?", default="weather_data_2020.csv")
+    indexes.add_argument("--output", default="explain.jsonl")
+    args = parser.parse_args()
+
+    if args.command == "suite":
+        run_suite(args.stations, args.years, args.output, args.dsn, args.per_row)
+    elif args.command == "generate":
+        print(f"Wrote {generate_weather_csv(args.output, args.stations, args.years, args.start_year)} lines")
+    elif args.command == "insert-paths":
+        compare_insert_paths(args.file, args.dsn)
+    elif args.command == "fetch":
+        compare_fetch(args.file, args.dsn)
+    elif args.command == "startup":
+        sys.exit(0 if check_startup() else 1)
+    elif args.command == "memory":
+        compare_memory(args.file)
+    else:
+        compare_indexes(args.file, args.output, args.dsn)
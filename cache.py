@@ -0,0 +1,70 @@
+import collections
+import glob
+import hashlib
+import json
+import os
+import threading
+
+import pandas as pd
+
+
+# Cache of report query results, see DBManager(cache=...).
+# Entries are keyed by the query text and its parameters and remember the data version they were
+# computed at; a lookup with any other version is a miss, so every load invalidates the cache.
+# The most recently used max_entries results are kept in memory. With parquet_dir, results are also
+# stored as Parquet files (requires pyarrow), so they survive between runs.
+class ResultCache:
+    def __init__(self, max_entries=128, parquet_dir=None):
+        self.max_entries = max_entries
+        self.parquet_dir = parquet_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        if parquet_dir is not None:
+            os.makedirs(parquet_dir, exist_ok=True)
+
+    # Key of a query and its parameters
+    @staticmethod
+    def key(query, parameters=None):
+        payload = json.dumps([str(query), parameters or {}], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    # Return a copy of the cached result of key at the given data version, or None
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1].copy()
+        if self.parquet_dir is not None and os.path.exists(self._path(key, version)):
+            df = pd.read_parquet(self._path(key, version))
+            self._remember(key, version, df)
+            with self._lock:
+                self.hits += 1
+            return df.copy()
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, version, df):
+        self._remember(key, version, df.copy())
+        if self.parquet_dir is not None:
+            for path in glob.glob(self._path(key, "*")):
+                os.remove(path)
+            df.to_parquet(self._path(key, version), index=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key, version, df):
+        with self._lock:
+            self._entries[key] = (version, df)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _path(self, key, version):
+        return os.path.join(self.parquet_dir, f"{key}-{version}.parquet")
@@ -1,7 +1,6 @@
 import sqlalchemy
 import pandas as pd
 from sqlalchemy.sql import text
-import matplotlib.pyplot as plt
 # Exercise 1
 class DBManager:
     # Define the object components (the engine and relations, etc)
@@ -278,6 +277,8 @@ class DBManager:
         print(df)
 
         # Plot the number of rainy days for each month for each location
+        import matplotlib.pyplot as plt
+
         for name, group in df.groupby("name"):
             plt.figure()
             plt.bar(group["month"], group["rainy_days"])
@@ -308,6 +309,8 @@ class DBManager:
         print(df)
 
         # Plot the average temperature throughout the year for each location, plot all the graphs into the same figure
+        import matplotlib.pyplot as plt
+
         fig, ax = plt.subplots()
         for name, group in df.groupby("name"):
             ax.plot(group["month"], group["avg_temperature"], label=name)
@@ -400,4 +403,5 @@ def main():
     db_manager.query_05()
     print("\n")
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
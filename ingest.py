@@ -0,0 +1,139 @@
+import argparse
+import concurrent.futures
+import glob
+import os
+import threading
+import time
+
+import pandas
+
+import db
+import load_data
+import validate
+
+
+# Expand a directory, a glob pattern or a file name to the sorted list of CSV files to ingest
+def find_files(pattern):
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.csv")
+    return sorted(glob.glob(pattern))
+
+
+# Read, sanitize and validate one file (runs in a worker process). The rejected rows are written to
+# <reject_dir>/<file name>.rejects.csv when reject_dir is given. With known_places, the rows of other
+# place codes are rejected too (see validate.validate_data).
+def sanitize_file(file_path, reject_dir=None, known_places=None):
+    reject_path = None
+    if reject_dir is not None:
+        reject_path = os.path.join(reject_dir, os.path.basename(file_path) + ".rejects.csv")
+    weather_data, rejects = load_data.sanitize_checked(pandas.read_csv(file_path))
+    weather_data, _ = validate.validate_data(weather_data, known_places, reject_path, rejects)
+    return weather_data
+
+
+# Write one sanitized file to the database (runs on a writer thread with its own pooled connection)
+def write_file(db_manager, weather_data, incremental, batch_size):
+    if incremental:
+        db_manager.insert_incremental(batch_size, weather_data)
+    else:
+        db_manager.upsert_place(weather_data)
+        db_manager.copy_observation(batch_size, weather_data)
+        db_manager.copy_temperature(batch_size, weather_data)
+
+
+# Sanitize the files in parallel worker processes and load them through a bounded set of writer threads.
+# At most 2 x workers files are being sanitized and 2 x writers sanitized files wait for a writer, so memory
+# stays bounded. A failing file is reported and skipped without stopping the others. known_places_only
+# (incremental loads) only loads the rows of the stations stored before the ingestion started.
+# Returns a dictionary mapping every file to None (loaded) or the error message.
+def ingest_files(
+    file_paths,
+    workers=None,
+    writers=2,
+    incremental=False,
+    batch_size=db.BULK_BATCH_SIZE,
+    reject_dir=None,
+    known_places_only=False,
+):
+    workers = workers or os.cpu_count()
+    total = len(file_paths)
+    results = {}
+    lock = threading.Lock()
+    writer_slots = threading.BoundedSemaphore(2 * writers)
+
+    db_manager = db.DBManager(None, pool_settings={"pool_size": writers, "max_overflow": 0})
+    db_manager.init_db_connection(incremental=incremental)
+    known_places = db_manager.place_codes() if known_places_only else None
+
+    def report(file_path, error, message):
+        with lock:
+            results[file_path] = error
+            print(f"[{len(results)}/{total}] {file_path}: {message}")
+
+    def write(file_path, weather_data):
+        start_time = time.perf_counter()
+        try:
+            write_file(db_manager, weather_data, incremental, batch_size)
+        except Exception as e:
+            report(file_path, str(e), f"loading failed: {e}")
+        else:
+            report(file_path, None, f"loaded {len(weather_data)} rows in {time.perf_counter() - start_time:.2f}s")
+        finally:
+            writer_slots.release()
+
+    remaining = iter(file_paths)
+    with concurrent.futures.ProcessPoolExecutor(workers) as sanitizers, concurrent.futures.ThreadPoolExecutor(
+        writers
+    ) as writer_pool:
+        sanitizing = {}
+
+        def submit_next():
+            file_path = next(remaining, None)
+            if file_path is not None:
+                sanitizing[sanitizers.submit(sanitize_file, file_path, reject_dir, known_places)] = file_path
+
+        for _ in range(2 * workers):
+            submit_next()
+        while sanitizing:
+            done, _ = concurrent.futures.wait(sanitizing, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                file_path = sanitizing.pop(future)
+                try:
+                    weather_data = future.result()
+                except Exception as e:
+                    report(file_path, str(e), f"sanitation failed: {e}")
+                else:
+                    writer_slots.acquire()
+                    writer_pool.submit(write, file_path, weather_data)
+                submit_next()
+
+    db_manager.engine.dispose()
+    failed = [file_path for file_path, error in results.items() if error is not None]
+    print(f"Loaded {total - len(failed)} of {total} files")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load many weather CSV files into the database in parallel")
+    parser.add_argument("pattern", help="directory, glob pattern or CSV file")
+    parser.add_argument("--workers", type=int, default=None, help="sanitizing processes (default: all cores)")
+    parser.add_argument("--writers", type=int, default=2, help="database writer connections")
+    parser.add_argument("--incremental", action="store_true", help="keep the database and upsert new rows")
+    parser.add_argument("--batch-size", type=int, default=db.BULK_BATCH_SIZE)
+    parser.add_argument("--reject-dir", default=None, help="write the rows failing validation to this directory")
+    parser.add_argument(
+        "--known-places", action="store_true", help="with --incremental: only load the stations already stored"
+    )
+    args = parser.parse_args()
+    if args.known_places and not args.incremental:
+        parser.error("--known-places needs --incremental")
+    results = ingest_files(
+        find_files(args.pattern),
+        args.workers,
+        args.writers,
+        args.incremental,
+        args.batch_size,
+        args.reject_dir,
+        args.known_places,
+    )
+    raise SystemExit(1 if any(results.values()) else 0)
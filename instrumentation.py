@@ -0,0 +1,171 @@
+import bisect
+import collections
+import contextlib
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (in seconds) of the statement latency histogram buckets
+LATENCY_BUCKETS = [0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 60]
+
+
+# Timing and row count statistics of a DBManager, see DBManager(metrics=...).
+# attach() hooks the SQLAlchemy cursor events of an engine to collect a latency histogram and row
+# counts per statement, and logs statements slower than slow_query_seconds. stage() times a block
+# (DBManager wraps its load and query methods in stages) and sums the rows its statements read and wrote.
+class Instrumentation:
+    def __init__(self, slow_query_seconds=1.0, buckets=LATENCY_BUCKETS):
+        self.slow_query_seconds = slow_query_seconds
+        self.buckets = list(buckets)
+        self.statements = {}
+        self.stages = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def attach(self, engine):
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    # Time a block as the stage name. Stages can be nested; the rows of a statement count for every
+    # stage it runs in, up to the innermost isolated one. The rows of an isolated stage (e.g. the upkeep of
+    # aggregates and of the data version after a load) only count for itself and the stages nested in it,
+    # so that a load stage reports the rows it loaded.
+    @contextlib.contextmanager
+    def stage(self, name, isolated=False):
+        stack = self._stage_stack()
+        stack.append((name, isolated))
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start_time
+            stack.pop()
+            with self._lock:
+                stats = self._stage(name)
+                stats["count"] += 1
+                stats["seconds"] += elapsed
+
+    # Count rows written outside of the cursor events (e.g. with COPY on a raw connection)
+    def add_rows(self, rows, written=True):
+        with self._lock:
+            self._count_rows(rows, written)
+
+    def reset(self):
+        with self._lock:
+            self.statements.clear()
+            self.stages.clear()
+
+    def to_dict(self):
+        with self._lock:
+            stages = {}
+            for name, stats in self.stages.items():
+                rows = stats["rows_written"] or stats["rows_read"]
+                stages[name] = {**stats, "rows_per_second": rows / stats["seconds"] if stats["seconds"] else None}
+            return {
+                "buckets": self.buckets,
+                "statements": {statement: dict(stats) for statement, stats in self.statements.items()},
+                "stages": stages,
+            }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    # Export in the Prometheus text exposition format
+    def to_prometheus(self):
+        data = self.to_dict()
+        lines = [
+            "# HELP weatherdata_statement_duration_seconds Latency of the SQL statements.",
+            "# TYPE weatherdata_statement_duration_seconds histogram",
+        ]
+        for statement, stats in data["statements"].items():
+            label = _statement_label(statement)
+            cumulative = 0
+            for bound, count in zip(self.buckets, stats["histogram"]):
+                cumulative += count
+                lines.append(f'weatherdata_statement_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'weatherdata_statement_duration_seconds_bucket{{{label},le="+Inf"}} {stats["count"]}')
+            lines.append(f"weatherdata_statement_duration_seconds_sum{{{label}}} {stats['seconds']}")
+            lines.append(f"weatherdata_statement_duration_seconds_count{{{label}}} {stats['count']}")
+        lines += [
+            "# HELP weatherdata_statement_rows_total Rows returned or affected by the SQL statements.",
+            "# TYPE weatherdata_statement_rows_total counter",
+        ]
+        for statement, stats in data["statements"].items():
+            lines.append(f"weatherdata_statement_rows_total{{{_statement_label(statement)}}} {stats['rows']}")
+        for metric, key, kind, description in [
+            ("stage_duration_seconds_total", "seconds", "counter", "Time spent in the stage."),
+            ("stage_runs_total", "count", "counter", "Number of runs of the stage."),
+            ("stage_rows_read_total", "rows_read", "counter", "Rows read in the stage."),
+            ("stage_rows_written_total", "rows_written", "counter", "Rows written in the stage."),
+            ("stage_rows_per_second", "rows_per_second", "gauge", "Rows per second of the stage."),
+        ]:
+            lines += [f"# HELP weatherdata_{metric} {description}", f"# TYPE weatherdata_{metric} {kind}"]
+            for name, stats in data["stages"].items():
+                if stats[key] is not None:
+                    lines.append(f'weatherdata_{metric}{{stage="{_escape(name)}"}} {stats[key]}')
+        return "\n".join(lines) + "\n"
+
+    # Write the statistics to a file, as JSON or in the Prometheus text format
+    def export(self, file_path, format="json"):
+        with open(file_path, "w") as file:
+            file.write(self.to_prometheus() if format == "prometheus" else self.to_json())
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        rows = max(cursor.rowcount, 0)
+        statement = " ".join(statement.split())
+        if elapsed > self.slow_query_seconds:
+            logger.warning("Slow query (%.3fs, %d rows): %s", elapsed, rows, statement)
+        written = not re.match(r"(?i)\s*(SELECT|WITH|EXPLAIN|SHOW)\b", statement)
+        with self._lock:
+            stats = self.statements.get(statement)
+            if stats is None:
+                stats = self.statements[statement] = {
+                    "count": 0, "seconds": 0.0, "rows": 0, "max_seconds": 0.0, "histogram": [0] * len(self.buckets)
+                }
+            stats["count"] += 1
+            stats["seconds"] += elapsed
+            stats["rows"] += rows
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+            bucket = bisect.bisect_left(self.buckets, elapsed)
+            if bucket < len(self.buckets):
+                stats["histogram"][bucket] += 1
+            self._count_rows(rows, written)
+
+    # Add rows to the current stages, from the innermost one out to the innermost isolated one
+    def _count_rows(self, rows, written):
+        for name, isolated in reversed(self._stage_stack()):
+            self._stage(name)["rows_written" if written else "rows_read"] += rows
+            if isolated:
+                break
+
+    def _stage_stack(self):
+        if not hasattr(self._local, "stages"):
+            self._local.stages = []
+        return self._local.stages
+
+    def _stage(self, name):
+        if name not in self.stages:
+            self.stages[name] = {"count": 0, "seconds": 0.0, "rows_read": 0, "rows_written": 0}
+        return self.stages[name]
+
+
+# Prometheus labels of a statement: its beginning and a hash telling apart statements with the same beginning
+def _statement_label(statement):
+    digest = hashlib.sha1(statement.encode()).hexdigest()[:8]
+    return f'statement="{_escape(statement[:80])}",id="{digest}"'
+
+
+# Escape a Prometheus label value
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -1,3 +1,6 @@
+import hashlib
+import os
+
 import pandas
 
 # Sanitize the data as following:
@@ -9,46 +12,203 @@ import pandas
 # determines.
 
 
-# Load the data from the CSV files
-def load_data(file_path) -> pandas.DataFrame:
-    try:
-        weather_data = pandas.read_csv(file_path)
-        print(weather_data.head())
+# Columns identifying one observation day of one place
+DAY_KEY = ["place", "year", "month", "day"]
 
-        # Replace missing values with NULL
-        weather_data = weather_data.fillna("NULL")
+# Number of CSV lines read at a time by the streaming loader
+CHUNK_SIZE = 100000
+
+# Version of the sanitation rules. It is part of the key of the sanitized-data cache (see load_data),
+# so bump it whenever sanitize_data changes its output.
+SANITATION_VERSION = 2
+
+# Column types of the typed loading mode (load_data(..., typed=True)): small integer date parts,
+# nullable float32 measurements holding real NA values instead of "NULL" strings and categorical
+# text columns. The coordinates stay float64, the database stores them with full precision.
+TYPED_DTYPES = {
+    "year": "int16",
+    "month": "int16",
+    "day": "int16",
+    "time": "category",
+    "timezone": "category",
+    "rain": "Float32",
+    "snow": "Float32",
+    "air_temperature": "Float32",
+    "ground_temperature": "Float32",
+    "highest_temperature": "Float32",
+    "lowest_temperature": "Float32",
+    "place": "category",
+    "place_code": "category",
+    "latitude": "float64",
+    "longitude": "float64",
+}
 
-        # Replace -1 in rain and snow with 0
-        weather_data["rain"] = weather_data["rain"].replace(-1, 0)
-        weather_data["snow"] = weather_data["snow"].replace(-1, 0)
-
-        # Get all records with time = 06:00
-        time_06 = weather_data[weather_data["time"] == "06:00"]
-        print(time_06)
-
-        # Assign ground temperature to that day
-        for index, row in time_06.iterrows():
-            day = row["day"]
-            month = row["month"]
-            year = row["year"]
-            place = row["place"]
-            ground_temperature = row["ground_temperature"]
-            weather_data.loc[
-                (weather_data["day"] == day)
-                & (weather_data["month"] == month)
-                & (weather_data["year"] == year)
-                & (weather_data["place"] == place),
-                "ground_temperature",
-            ] = ground_temperature
-
-        # Drop the records with time = 06:00
-        weather_data = weather_data[weather_data["time"] != "06:00"]
-
-        # export the data to a new CSV file
-        weather_data.to_csv("weather_data_sanitized.csv", index=False)
-
-        print(weather_data)
-        return weather_data
+# The text columns of TYPED_DTYPES, read with their type in the typed mode. The numeric columns are converted
+# by sanitize_data, after validate.check_raw has set the rows with bad cells aside, so a bad cell cannot fail
+# the read.
+TEXT_DTYPES = {column: dtype for column, dtype in TYPED_DTYPES.items() if dtype == "category"}
+
+
+# Load the data from the CSV files.
+# With typed, the columns get the types of TYPED_DTYPES and missing values stay NA (written as empty
+# fields to the sanitized CSV file) instead of becoming "NULL" strings, which takes several times less memory.
+# With cache_dir, the sanitized frame is stored there as a Feather file keyed on the SHA-256 of the input
+# file, SANITATION_VERSION and typed (requires pyarrow). A later load of the same content reads the
+# memory-mapped Feather file instead of parsing and sanitizing the CSV again, and does not rewrite
+# weather_data_sanitized.csv.
+# Rows with cells that are not numbers are left out (see load_checked).
+def load_data(file_path, typed=False, cache_dir=None) -> pandas.DataFrame:
+    try:
+        return load_checked(file_path, typed, cache_dir)[0]
     except Exception as e:
         print(e)
         print("Data loading failed")
+
+
+# load_data returning the sanitized data and the raw rows rejected by validate.check_raw (which are cached
+# with the data). Errors are raised, e.g. ValueError when a required column is missing.
+def load_checked(file_path, typed=False, cache_dir=None):
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = _cache_path(file_path, typed, cache_dir)
+        if os.path.exists(cache_path):
+            weather_data, rejects = _read_cached(cache_path, typed)
+            print(weather_data)
+            return weather_data, rejects
+
+    weather_data = pandas.read_csv(file_path, dtype=TEXT_DTYPES if typed else None)
+    print(weather_data.head())
+
+    weather_data, rejects = sanitize_checked(weather_data, typed)
+
+    # export the data to a new CSV file
+    weather_data.to_csv("weather_data_sanitized.csv", index=False)
+    if cache_path is not None:
+        _write_cached(weather_data, rejects, cache_path, typed)
+
+    print(weather_data)
+    return weather_data, rejects
+
+
+# SHA-256 of the content of a file
+def file_digest(file_path):
+    with open(file_path, "rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+# Path of the cached sanitized frame of a file
+def _cache_path(file_path, typed, cache_dir):
+    digest = file_digest(file_path)
+    return os.path.join(cache_dir, f"{digest}-v{SANITATION_VERSION}-{'typed' if typed else 'default'}.feather")
+
+
+# Read a cached sanitized frame (the "NULL" strings of the default mode are stored as NaN) and its rejected rows
+def _read_cached(cache_path, typed):
+    from pyarrow import feather
+
+    weather_data = feather.read_table(cache_path, memory_map=True).to_pandas()
+    rejects = feather.read_table(_rejects_path(cache_path)).to_pandas()
+    return (weather_data if typed else weather_data.fillna("NULL")), rejects
+
+
+# Store a sanitized frame and its rejected rows (as text, the rejected cells may be anything) in the cache;
+# the files are written under a temporary name and renamed, the frame last, so concurrent loads never read
+# a partial entry
+def _write_cached(weather_data, rejects, cache_path, typed):
+    from pyarrow import feather
+
+    if not typed:
+        weather_data = weather_data.mask(weather_data.eq("NULL")).infer_objects()
+    os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+    for frame, path in [(rejects.astype("string"), _rejects_path(cache_path)), (weather_data, cache_path)]:
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        feather.write_feather(frame, temporary_path)
+        os.replace(temporary_path, path)
+
+
+# Path of the cached rejected rows of a cached sanitized frame
+def _rejects_path(cache_path):
+    return cache_path.replace(".feather", ".rejects.feather")
+
+
+# Load the data from the CSV file in chunks and yield each sanitized chunk, so that memory stays
+# bounded by the chunk size. The rows of the last day of every chunk are carried over to the next one,
+# so a 00:00/06:00 pair spanning a chunk boundary is still merged (the rows of a day are adjacent in the files).
+def load_data_chunks(file_path, chunk_size=CHUNK_SIZE, output_path="weather_data_sanitized.csv", typed=False):
+    carry_over = None
+    header = True
+    for chunk in pandas.read_csv(file_path, chunksize=chunk_size, dtype=TEXT_DTYPES if typed else None):
+        if carry_over is not None:
+            chunk = pandas.concat([carry_over, chunk], ignore_index=True)
+        last_day = (chunk[DAY_KEY] == chunk[DAY_KEY].iloc[-1]).all(axis=1)
+        carry_over = chunk[last_day]
+        if last_day.all():
+            continue
+        header = yield from _sanitize_chunk(chunk[~last_day], output_path, header, typed)
+    if carry_over is not None and len(carry_over):
+        yield from _sanitize_chunk(carry_over, output_path, header, typed)
+
+
+# Sanitize and validate one chunk (validate.validate_data, the rejected rows are left out), append it to the
+# sanitized CSV file and yield it. Duplicate place codes and dates are found within a chunk; the rows of a
+# day stay in one chunk (see load_data_chunks).
+def _sanitize_chunk(chunk, output_path, header, typed=False):
+    import validate
+
+    weather_data, rejects = sanitize_checked(chunk, typed)
+    weather_data, _ = validate.validate_data(weather_data, rejects=rejects)
+    if output_path is not None:
+        weather_data.to_csv(output_path, mode="w" if header else "a", header=header, index=False)
+    if len(weather_data):
+        yield weather_data
+    return False
+
+
+# Replace the "NULL" strings of the untyped load_data mode by NaN (typed columns already hold NA)
+def nulls(values):
+    if values.dtype != object:
+        return values
+    return values.mask(values.eq("NULL"))
+
+
+# Check the raw rows (validate.check_raw) and sanitize the passing ones. Returns the sanitized data and
+# the rejected raw rows.
+def sanitize_checked(weather_data, typed=False):
+    # validate imports this module
+    import validate
+
+    weather_data, rejects = validate.check_raw(weather_data)
+    return sanitize_data(weather_data, typed), rejects
+
+
+# Sanitize the raw observations and keep one row (the 00:00 one) per place and day
+# (typed: see load_data)
+def sanitize_data(weather_data, typed=False) -> pandas.DataFrame:
+    if typed:
+        # Keep missing values as NA (the categories of concatenated chunks are unified again)
+        weather_data = weather_data.astype(TYPED_DTYPES)
+    else:
+        # Replace missing values with NULL
+        weather_data = weather_data.fillna("NULL")
+
+    # Replace -1 in rain and snow with 0
+    weather_data["rain"] = weather_data["rain"].replace(-1, 0)
+    weather_data["snow"] = weather_data["snow"].replace(-1, 0)
+
+    # Split the records with time = 06:00 from the rest
+    is_06 = weather_data["time"] == "06:00"
+    time_06 = weather_data.loc[is_06, DAY_KEY + ["ground_temperature"]]
+    weather_data = weather_data[~is_06]
+
+    # Assign the ground temperature of the 06:00 record to that day with one keyed merge
+    # (when a day has several 06:00 records, the last one wins)
+    time_06 = time_06.drop_duplicates(DAY_KEY, keep="last")
+    time_06["has_06"] = True
+    merged = weather_data[DAY_KEY].merge(time_06, on=DAY_KEY, how="left", suffixes=("", "_06"))
+    merged.index = weather_data.index
+    ground_temperature = weather_data["ground_temperature"].where(
+        merged["has_06"].isna(), merged["ground_temperature"]
+    )
+    weather_data = weather_data.assign(ground_temperature=ground_temperature)
+
+    return weather_data
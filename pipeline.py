@@ -0,0 +1,114 @@
+import pandas
+from sqlalchemy.sql import text
+
+import db
+import load_data
+import validate
+
+# Stages of the load pipeline, in order
+STAGES = ["sanitize", "place", "observation", "temperature", "aggregates"]
+
+
+# Load a CSV file as a resumable pipeline of STAGES, recording the progress in the load_checkpoint table:
+#   sanitize     read, sanitize and validate the file (see load_data.load_checked and validate.validate_data)
+#   place        upsert the places
+#   observation  COPY the observations, batch by batch
+#   temperature  COPY the temperatures, batch by batch
+#   aggregates   recompute monthly_summary and correlation_stats for the places and months of the file
+# Every COPY batch commits together with its checkpoint. The database is kept (init_db_connection in
+# incremental mode), so rerunning the pipeline on the same file after a failure skips the finished
+# stages and continues the interrupted one after its last committed batch; rerunning it after a
+# successful load does nothing. Rows already stored by other loads (e.g. an interrupted app.py load)
+# are skipped. Files are told apart by their content, so a renamed file is not loaded again.
+# known_places_only: only load the rows of the stations already stored (the place table is the
+# known_places of validate.validate_data).
+# Returns the DBManager.
+def run_pipeline(
+    file_path,
+    dsn=None,
+    typed=False,
+    batch_size=db.BULK_BATCH_SIZE,
+    cache_dir=None,
+    reject_path=None,
+    partition_by=None,
+    metrics=None,
+    known_places_only=False,
+):
+    input_key = f"{load_data.file_digest(file_path)}-v{load_data.SANITATION_VERSION}"
+    db_manager = db.DBManager(None, dsn, metrics=metrics)
+    db_manager.init_db_connection(incremental=True, partition_by=partition_by)
+    checkpoints = db_manager.load_checkpoints(input_key)
+    if all(checkpoints.get(stage, {}).get("done") for stage in STAGES):
+        print(f"{file_path} is already loaded")
+        return db_manager
+    if checkpoints:
+        progress = [
+            f"{stage} ({'done' if state['done'] else str(state['rows']) + ' rows'})" for stage, state in checkpoints.items()
+        ]
+        print(f"Resuming the load of {file_path} after: {', '.join(progress)}")
+
+    # Sanitizing is deterministic, so a resumed run sanitizes the file again (or reads it from the cache)
+    # and gets the rows already loaded in the same order
+    weather_data, rejects = load_data.load_checked(file_path, typed, cache_dir)
+    known_places = db_manager.place_codes() if known_places_only else None
+    weather_data, _ = validate.validate_data(weather_data, known_places, reject_path, rejects)
+    sanitized = checkpoints.get("sanitize")
+    if sanitized is not None and sanitized["rows"] != len(weather_data):
+        raise ValueError(
+            f"{file_path} now has {len(weather_data)} valid rows, the interrupted load had {sanitized['rows']}"
+        )
+    db_manager.data = weather_data
+    db_manager.save_checkpoint(input_key, "sanitize", file_path, len(weather_data), done=True)
+
+    if not checkpoints.get("place", {}).get("done"):
+        db_manager.upsert_place(weather_data)
+        db_manager.save_checkpoint(input_key, "place", file_path, len(weather_data), done=True)
+
+    for stage, frame in [
+        ("observation", db_manager.observation_frame(weather_data)),
+        ("temperature", db_manager.temperature_frame(weather_data)),
+    ]:
+        state = checkpoints.get(stage, {})
+        if state.get("done"):
+            continue
+        # The checkpoint counts the rows of the file order, skip them and any row stored by another load
+        frame = frame.reset_index(drop=True)
+        remaining = _unstored(db_manager, stage, frame.iloc[state.get("rows", 0):])
+
+        def on_batch(cursor, rows, stage=stage, remaining=remaining):
+            committed = int(remaining.index[rows - 1]) + 1
+            db_manager.save_checkpoint(input_key, stage, file_path, committed, batches=1, cursor=cursor)
+
+        db_manager.copy_frame(stage, remaining, batch_size, on_batch)
+        db_manager.save_checkpoint(input_key, stage, file_path, len(frame), done=True)
+
+    # The aggregates are recomputed from the tables (not added up), so repeating this stage is harmless
+    db_manager.refresh_monthly_summary(weather_data)
+    for source in db.CORRELATIONS:
+        db_manager.refresh_correlation_stats(source, weather_data)
+    db_manager.save_checkpoint(input_key, "aggregates", file_path, len(weather_data), done=True)
+    return db_manager
+
+
+# The rows of a frame of Observation or Temperature rows whose (place, date) is not stored in the table,
+# e.g. leaving out the rows written by an interrupted load that ran outside of the pipeline
+def _unstored(db_manager, table, frame):
+    if not len(frame):
+        return frame
+    query = text(f"""
+    SELECT place, date FROM {table}
+    WHERE date >= :start AND date <= :end AND place = ANY(CAST(:places AS varchar[]));
+    """)
+    parameters = {
+        "start": frame["date"].min().date(),
+        "end": frame["date"].max().date(),
+        "places": list(frame["place"].unique()),
+    }
+    stored = db_manager.fetch(query, parameters)
+    if not len(stored):
+        return frame
+    stored = pandas.MultiIndex.from_arrays([stored["place"], pandas.to_datetime(stored["date"])])
+    is_stored = pandas.MultiIndex.from_arrays([frame["place"], frame["date"]]).isin(stored)
+    if is_stored.any():
+        print(f"Skipping {is_stored.sum()} rows already stored in {table}")
+    return frame[~is_stored]
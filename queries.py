@@ -0,0 +1,132 @@
+from sqlalchemy.sql import text
+
+# SQL of the report queries run by DBManager.query_01 ... query_05
+
+# 1. The locations with most and least snowy days, the month with most snow of the first and the
+# month with most snowy days of the second, answered in one statement. Ties go to the first name and month.
+QUERY_01 = text("""
+WITH place_snow AS (
+    SELECT name, SUM(snowy_days) AS snowy_days
+    FROM monthly_summary
+    JOIN place ON monthly_summary.place = place.code
+    GROUP BY name
+    HAVING SUM(snowy_days) > 0
+), month_snow AS (
+    SELECT name, month, SUM(total_snow) AS total_snow, SUM(snowy_days) AS snowy_days,
+        row_number() OVER (PARTITION BY name ORDER BY SUM(total_snow) DESC, month) AS rank_by_snow,
+        row_number() OVER (PARTITION BY name ORDER BY SUM(snowy_days) DESC, month) AS rank_by_days
+    FROM monthly_summary
+    JOIN place ON monthly_summary.place = place.code
+    GROUP BY name, month
+    HAVING SUM(snowy_days) > 0
+), most AS (
+    SELECT * FROM place_snow ORDER BY snowy_days DESC, name LIMIT 1
+), least AS (
+    SELECT * FROM place_snow ORDER BY snowy_days ASC, name LIMIT 1
+)
+SELECT most.name AS most_name, most.snowy_days AS most_snowy_days,
+    most_month.month AS most_month, most_month.total_snow AS most_total_snow,
+    least.name AS least_name, least.snowy_days AS least_snowy_days,
+    least_month.month AS least_month, least_month.snowy_days AS least_month_snowy_days
+FROM most
+JOIN month_snow AS most_month ON most_month.name = most.name AND most_month.rank_by_snow = 1
+CROSS JOIN least
+JOIN month_snow AS least_month ON least_month.name = least.name AND least_month.rank_by_days = 1;
+""")
+
+# 2. Sample correlation coefficient between the highest and lowest temperatures, merged from the per place
+# statistics of correlation_stats (see DBManager.add_correlation_stats) instead of scanning Temperature.
+# Like corr(), NULL when either column is constant.
+QUERY_02_OVERALL = text("""
+WITH stats AS (
+    SELECT * FROM correlation_stats WHERE source = 'temperature' AND n > 0
+), total AS (
+    SELECT SUM(n * mean_x) / SUM(n) AS mean_x, SUM(n * mean_y) / SUM(n) AS mean_y FROM stats
+), merged AS (
+    SELECT SUM(stats.m2_x + stats.n * (stats.mean_x - total.mean_x) ^ 2) AS m2_x,
+        SUM(stats.m2_y + stats.n * (stats.mean_y - total.mean_y) ^ 2) AS m2_y,
+        SUM(stats.c_xy + stats.n * (stats.mean_x - total.mean_x) * (stats.mean_y - total.mean_y)) AS c_xy,
+        MIN(stats.min_x) < MAX(stats.max_x) AND MIN(stats.min_y) < MAX(stats.max_y) AS varies
+    FROM stats
+    CROSS JOIN total
+)
+SELECT CASE WHEN varies THEN c_xy / sqrt(m2_x * m2_y) END AS correlation
+FROM merged;
+""")
+
+# 2. The same correlation grouped by location (place name, like the corr() of the original report: the
+# statistics of stations sharing a name are merged as in QUERY_02_OVERALL)
+QUERY_02_BY_PLACE = text("""
+WITH stats AS (
+    SELECT place.name, correlation_stats.*
+    FROM correlation_stats
+    JOIN place ON correlation_stats.place = place.code
+    WHERE source = 'temperature' AND n > 0
+), total AS (
+    SELECT name, SUM(n * mean_x) / SUM(n) AS mean_x, SUM(n * mean_y) / SUM(n) AS mean_y FROM stats GROUP BY name
+), merged AS (
+    SELECT stats.name,
+        SUM(stats.m2_x + stats.n * (stats.mean_x - total.mean_x) ^ 2) AS m2_x,
+        SUM(stats.m2_y + stats.n * (stats.mean_y - total.mean_y) ^ 2) AS m2_y,
+        SUM(stats.c_xy + stats.n * (stats.mean_x - total.mean_x) * (stats.mean_y - total.mean_y)) AS c_xy,
+        MIN(stats.min_x) < MAX(stats.max_x) AND MIN(stats.min_y) < MAX(stats.max_y) AS varies
+    FROM stats
+    JOIN total ON stats.name = total.name
+    GROUP BY stats.name
+)
+SELECT name, CASE WHEN varies THEN c_xy / sqrt(m2_x * m2_y) END AS correlation
+FROM merged;
+""")
+
+# 3. Correlation between average temperature and latitude of the location (place name, merged like
+# QUERY_02_BY_PLACE; NULL: latitude is constant per station, so it only varies across stations sharing a name)
+QUERY_03 = text("""
+WITH stats AS (
+    SELECT place.name, correlation_stats.*
+    FROM correlation_stats
+    JOIN place ON correlation_stats.place = place.code
+    WHERE source = 'observation' AND n > 0
+), total AS (
+    SELECT name, SUM(n * mean_x) / SUM(n) AS mean_x, SUM(n * mean_y) / SUM(n) AS mean_y FROM stats GROUP BY name
+), merged AS (
+    SELECT stats.name,
+        SUM(stats.m2_x + stats.n * (stats.mean_x - total.mean_x) ^ 2) AS m2_x,
+        SUM(stats.m2_y + stats.n * (stats.mean_y - total.mean_y) ^ 2) AS m2_y,
+        SUM(stats.c_xy + stats.n * (stats.mean_x - total.mean_x) * (stats.mean_y - total.mean_y)) AS c_xy,
+        MIN(stats.min_x) < MAX(stats.max_x) AND MIN(stats.min_y) < MAX(stats.max_y) AS varies
+    FROM stats
+    JOIN total ON stats.name = total.name
+    GROUP BY stats.name
+)
+SELECT name, CASE WHEN varies THEN c_xy / sqrt(m2_x * m2_y) END AS correlation
+FROM merged;
+""")
+
+# 4. Number of rainy days for each month for each location
+QUERY_04 = text("""
+SELECT place.name, month, SUM(rainy_days) AS rainy_days
+FROM monthly_summary
+JOIN place ON monthly_summary.place = place.code
+GROUP BY place.name, month
+HAVING SUM(rainy_days) > 0
+ORDER BY place.name, month;
+""")
+
+# 5. Average temperature throughout the year for each location
+QUERY_05 = text("""
+SELECT place.name, month, SUM(air_temperature_sum) / SUM(air_temperature_count) AS avg_temperature
+FROM monthly_summary
+JOIN place ON monthly_summary.place = place.code
+GROUP BY place.name, month
+HAVING SUM(air_temperature_count) > 0
+ORDER BY place.name, month;
+""")
+
+# The statements run by each report, used by DBManager.explain_reports
+REPORT_QUERIES = {
+    "query_01": [QUERY_01],
+    "query_02": [QUERY_02_OVERALL, QUERY_02_BY_PLACE],
+    "query_03": [QUERY_03],
+    "query_04": [QUERY_04],
+    "query_05": [QUERY_05],
+}
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# File of an output directory recording the data each chart in it was rendered from
+MANIFEST = "charts.json"
+
+# Charts rendered per task by the worker processes of the headless mode
+CHARTS_PER_TASK = 25
+
+
+# Print and plot the results of the report queries (fetched by db.DBManager or async_db.AsyncDBManager).
+# By default the charts are shown with pyplot and saved in the working directory. With an output_dir,
+# they are rendered headless (see render_charts) into output_dir instead.
+# matplotlib is imported only when a chart is drawn, so importing this module stays cheap.
+
+# 1. Most and least snowy locations and their top months, from the one row of queries.QUERY_01
+def show_query_01(df):
+    print("------------------------ Query 1 ------------------------")
+    print("Location with most snowy days: ")
+    print(_columns(df, most_name="name", most_snowy_days="snowy_days"))
+    print("Month with most snow for the location with most snowy days: ")
+    print(_columns(df, most_name="name", most_month="month", most_total_snow="total_snow"))
+    print("Location with least snowy days: ")
+    print(_columns(df, least_name="name", least_snowy_days="snowy_days"))
+    print("Month with most snow for the location with least snowy days: ")
+    print(_columns(df, least_name="name", least_month="month", least_month_snowy_days="snowy_days"))
+
+
+# 2. Correlation between lowest and highest temperatures, overall and by location
+def show_query_02(overall, by_place):
+    print("------------------------ Query 2 ------------------------")
+    print("Correlation coefficient between lowest and highest temperatures: ")
+    print(overall)
+    print("Correlation coefficient between lowest and highest temperatures grouped by location: ")
+    print(by_place)
+
+
+# 3. Correlation between average temperature and latitude of the location
+def show_query_03(df):
+    print("------------------------ Query 3 ------------------------")
+    print("Correlation between average temperature and latitude of the location: ")
+    print(df)
+
+
+# 4. Bar plot of the number of rainy days for each month, one per location
+def show_query_04(df, output_dir=None, workers=None):
+    print("------------------------ Query 4 ------------------------")
+    print("Number of rainy days for each month for each location: ")
+    print(df)
+
+    if output_dir is not None:
+        charts = {
+            f"{name}_rainy_days.png": (name, group["month"].tolist(), group["rainy_days"].tolist())
+            for name, group in df.groupby("name")
+        }
+        rendered = render_charts(charts, _draw_rainy_days, output_dir, workers)
+        print(f"Rendered {len(rendered)} of {len(charts)} rainy day charts into {output_dir}")
+        return
+
+    # Plot the number of rainy days for each month for each location
+    import matplotlib.pyplot as plt
+
+    for name, group in df.groupby("name"):
+        plt.figure()
+        plt.bar(group["month"], group["rainy_days"])
+        plt.xlabel("Month")
+        plt.ylabel("Rainy Days")
+        plt.title(f"Number of Rainy Days for each Month at {name}")
+        plt.savefig(f"{name}_rainy_days.png")
+        plt.show()
+        plt.close()
+
+
+# 5. Average temperature throughout the year for each location, all in the same figure
+def show_query_05(df, output_dir=None):
+    print("------------------------ Query 5 ------------------------")
+    print("Average temperature throughout the year for each location: ")
+    print(df)
+
+    if output_dir is not None:
+        lines = [
+            (name, group["month"].tolist(), group["avg_temperature"].tolist()) for name, group in df.groupby("name")
+        ]
+        rendered = render_charts({"average_temperature.png": (lines,)}, _draw_average_temperature, output_dir, 1)
+        print(f"Rendered {len(rendered)} of 1 average temperature charts into {output_dir}")
+        return
+
+    # Plot the average temperature throughout the year for each location, plot all the graphs into the same figure
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+    for name, group in df.groupby("name"):
+        ax.plot(group["month"], group["avg_temperature"], label=name)
+    ax.legend()
+    plt.xlabel("Month")
+    plt.ylabel("Average Temperature")
+    plt.title("Average Temperature throughout the Year for each Location")
+    plt.savefig("average_temperature.png")
+    plt.show()
+    plt.close(fig)
+
+
+# Render charts off-screen into output_dir. charts maps the file names to the arguments of draw, which
+# draws one chart on a matplotlib Figure (a module-level function, so the worker processes can run it).
+# Charts whose arguments are the same as when their file was written (see MANIFEST) are skipped. The others
+# are rendered in batches of CHARTS_PER_TASK by up to workers processes (default: one per CPU), each reusing
+# one Figure, so memory does not grow with the number of charts. Returns the file names rendered.
+def render_charts(charts, draw, output_dir, workers=None):
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+
+    pending = []
+    for file_name, arguments in charts.items():
+        digest = hashlib.sha256(json.dumps([draw.__name__, arguments], default=str).encode()).hexdigest()
+        if manifest.get(file_name) != digest or not os.path.exists(os.path.join(output_dir, file_name)):
+            pending.append((file_name, arguments))
+        manifest[file_name] = digest
+
+    tasks = [(draw, output_dir, pending[start : start + CHARTS_PER_TASK]) for start in range(0, len(pending), CHARTS_PER_TASK)]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            list(executor.map(_render_task, tasks))
+    else:
+        for task in tasks:
+            _render_task(task)
+
+    temporary_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(temporary_path, "w") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    os.replace(temporary_path, manifest_path)
+    return [file_name for file_name, arguments in pending]
+
+
+# Render a batch of charts on one reused Figure (Agg canvas, no pyplot state)
+def _render_task(task):
+    from matplotlib.figure import Figure
+
+    draw, output_dir, charts = task
+    figure = Figure()
+    for file_name, arguments in charts:
+        figure.clear()
+        draw(figure, *arguments)
+        figure.savefig(os.path.join(output_dir, file_name))
+
+
+def _draw_rainy_days(figure, name, months, rainy_days):
+    ax = figure.subplots()
+    ax.bar(months, rainy_days)
+    ax.set_xlabel("Month")
+    ax.set_ylabel("Rainy Days")
+    ax.set_title(f"Number of Rainy Days for each Month at {name}")
+
+
+def _draw_average_temperature(figure, lines):
+    ax = figure.subplots()
+    for name, months, temperatures in lines:
+        ax.plot(months, temperatures, label=name)
+    ax.legend()
+    ax.set_xlabel("Month")
+    ax.set_ylabel("Average Temperature")
+    ax.set_title("Average Temperature throughout the Year for each Location")
+
+
+# Select and rename columns of a dataframe
+def _columns(df, **columns):
+    return df[list(columns)].rename(columns=columns)
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+# The modules of the repository are top-level modules in the parent directory
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+# The weather data file shipped with the repository
+WEATHER_DATA_2020 = os.path.join(REPO_DIR, "weather_data_2020.csv")
+
+
+# URL of a scratch database for the tests that need PostgreSQL (WEATHERDATA_TEST_DSN, by default the
+# weatherdata_test database of the default server); the tests are skipped when the server is not reachable.
+# The tests drop and recreate the database.
+@pytest.fixture(scope="session")
+def test_dsn():
+    import sqlalchemy
+
+    import db
+
+    dsn = sqlalchemy.engine.make_url(
+        os.environ.get("WEATHERDATA_TEST_DSN") or sqlalchemy.engine.make_url(db.DEFAULT_DSN).set(database="weatherdata_test")
+    )
+    server = sqlalchemy.create_engine(dsn.set(database="postgres"), poolclass=sqlalchemy.pool.NullPool)
+    try:
+        server.connect().close()
+    except sqlalchemy.exc.OperationalError as error:
+        pytest.skip(f"PostgreSQL is not reachable: {error}")
+    finally:
+        server.dispose()
+    return dsn
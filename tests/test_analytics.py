@@ -0,0 +1,54 @@
+import contextlib
+import io
+
+import pandas
+import pytest
+
+import analytics
+import benchmark
+import db
+import load_data
+import queries
+from conftest import WEATHER_DATA_2020
+
+
+# Load a CSV file into the test database and return the DBManager and the loaded data
+def load(file_path, dsn, typed=False):
+    with contextlib.redirect_stdout(io.StringIO()):
+        weather_data = load_data.load_data(file_path, typed)
+        db_manager = db.DBManager(weather_data, dsn)
+        db_manager.init_db_connection()
+        db_manager.insert_place()
+        db_manager.bulk_insert()
+    return db_manager, weather_data
+
+
+# The generated file has many months tied on snowy days and snow (e.g. months with snow every day)
+@pytest.fixture(scope="module")
+def synthetic_file(tmp_path_factory):
+    file_path = tmp_path_factory.mktemp("weather") / "weather.csv"
+    benchmark.generate_weather_csv(str(file_path), stations=4, years=2)
+    return str(file_path)
+
+
+# Every report statement gives the same result in PostgreSQL and in PandasAnalytics
+@pytest.mark.parametrize("typed", [False, True])
+@pytest.mark.parametrize("source", ["weather_data_2020", "synthetic"])
+def test_reports_match_sql(source, typed, test_dsn, synthetic_file, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    file_path = WEATHER_DATA_2020 if source == "weather_data_2020" else synthetic_file
+    db_manager, weather_data = load(file_path, test_dsn, typed)
+    try:
+        backend = analytics.PandasAnalytics(weather_data)
+        for statements in queries.REPORT_QUERIES.values():
+            for query in statements:
+                expected = db_manager.fetch(query)
+                # Unordered statements come sorted by name from PandasAnalytics
+                if "name" in expected:
+                    expected = expected.sort_values("name", kind="stable", ignore_index=True)
+                # The SQL correlations are None where NULL, an object column when all of them are
+                if "correlation" in expected:
+                    expected = expected.astype({"correlation": "float64"})
+                pandas.testing.assert_frame_equal(backend.fetch(query), expected, rtol=1e-9)
+    finally:
+        db_manager.drop_database()
@@ -0,0 +1,128 @@
+import contextlib
+import io
+
+import pandas
+import pytest
+from sqlalchemy.sql import text
+
+import db
+import load_data
+import queries
+from conftest import WEATHER_DATA_2020
+
+
+# The 2020 file loaded into the test database
+@pytest.fixture(scope="module")
+def db_manager(test_dsn, tmp_path_factory):
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(tmp_path_factory.mktemp("load"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            db_manager = db.DBManager(load_data.load_data(WEATHER_DATA_2020), test_dsn)
+            db_manager.init_db_connection()
+            db_manager.insert_place()
+            db_manager.bulk_insert()
+    yield db_manager
+    db_manager.drop_database()
+
+
+# fetch_many returns the same frames as one query at a time, whatever the column types
+def test_fetch_many_keeps_the_column_types(db_manager):
+    statements = [(query, None) for query_list in queries.REPORT_QUERIES.values() for query in query_list] + [
+        (text("SELECT place, date, rain FROM observation WHERE date < :end ORDER BY place, date"), {"end": "2020-02-01"}),
+        (text("SELECT place, date FROM observation WHERE date > :start"), {"start": "2100-01-01"}),
+        (text("SELECT TIMESTAMP '2020-01-01 06:00' AS observed_at, true AS flag"), None),
+    ]
+    for (query, parameters), batched in zip(statements, db_manager.fetch_many(statements)):
+        pandas.testing.assert_frame_equal(batched, db_manager.fetch(query, parameters))
+
+
+# Count the rows of Observation and Temperature of a year
+def count_rows(db_manager, year):
+    query = text("SELECT COUNT(*) AS n FROM {} WHERE extract(year from date) = :year")
+    return [int(db_manager.fetch(text(query.text.format(table)), {"year": year})["n"][0]) for table in ["observation", "temperature"]]
+
+
+# A detached partition that is kept does not stop later loads of its period, on the same manager and on a
+# new one; a month of a yearly partition detaches the year
+@pytest.mark.parametrize("detach", [{}, {"month": 3}, {"drop": True}])
+def test_reload_after_detach_partition(detach, test_dsn, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    dsn = test_dsn.set(database=f"{test_dsn.database}_partitions")
+    with contextlib.redirect_stdout(io.StringIO()):
+        weather_data = load_data.load_data(WEATHER_DATA_2020)
+        db_manager = db.DBManager(weather_data, dsn)
+        db_manager.init_db_connection(partition_by="year")
+        db_manager.insert_place()
+        db_manager.bulk_insert()
+    try:
+        expected = count_rows(db_manager, 2020)
+        with contextlib.redirect_stdout(io.StringIO()):
+            detached = db_manager.detach_partition(2020, **detach)
+        assert len(detached) == 2
+        assert count_rows(db_manager, 2020) == [0, 0]
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            db_manager.bulk_insert()
+        assert count_rows(db_manager, 2020) == expected
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            db_manager.detach_partition(2020, **detach)
+            reopened = db.DBManager(weather_data, dsn)
+            reopened.init_db_connection(incremental=True)
+            reopened.bulk_insert()
+        assert count_rows(reopened, 2020) == expected
+        reopened.engine.dispose()
+    finally:
+        db_manager.drop_database()
+
+
+# Opening a missing or empty database fails without creating anything
+def test_open_db_connection_does_not_create(test_dsn):
+    import sqlalchemy
+
+    dsn = test_dsn.set(database=f"{test_dsn.database}_missing")
+    db_manager = db.DBManager(None, dsn)
+    with pytest.raises(ValueError, match="does not exist"):
+        db_manager.open_db_connection()
+
+    server = sqlalchemy.create_engine(dsn.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    with server.connect() as connection:
+        assert connection.execute(text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": dsn.database}).first() is None
+        connection.execute(text(f"CREATE DATABASE {dsn.database}"))
+    try:
+        with pytest.raises(ValueError, match="is missing tables: place"):
+            db_manager.open_db_connection()
+        with db_manager.engine.connect() as connection:
+            assert connection.execute(text("SELECT COUNT(*) FROM pg_tables WHERE schemaname = 'public'")).scalar() == 0
+    finally:
+        db_manager.engine.dispose()
+        with server.connect() as connection:
+            connection.execute(text(f"DROP DATABASE {dsn.database}"))
+        server.dispose()
+
+
+# Incremental loads merge the statistics of their new rows instead of rescanning the stored history, and
+# end up with the statistics recomputed from the tables
+def test_incremental_load_merges_correlation_stats(test_dsn, tmp_path, monkeypatch):
+    import instrumentation
+
+    monkeypatch.chdir(tmp_path)
+    dsn = test_dsn.set(database=f"{test_dsn.database}_incremental")
+    query = text("SELECT * FROM correlation_stats ORDER BY source, place")
+    metrics = instrumentation.Instrumentation()
+    with contextlib.redirect_stdout(io.StringIO()):
+        weather_data = load_data.load_data(WEATHER_DATA_2020)
+        db_manager = db.DBManager(weather_data[weather_data["month"] < 12], dsn, metrics=metrics)
+        db_manager.init_db_connection()
+        db_manager.insert_incremental()
+        metrics.reset()
+        db_manager.insert_incremental(data=weather_data[(weather_data["month"] == 12) & (weather_data["day"] == 1)])
+        db_manager.insert_incremental(data=weather_data)
+    try:
+        assert not [statement for statement in metrics.statements if "regr_" in statement]
+        merged = db_manager.fetch(query)
+        for source in db.CORRELATIONS:
+            db_manager.refresh_correlation_stats(source)
+        pandas.testing.assert_frame_equal(merged, db_manager.fetch(query), rtol=1e-9)
+    finally:
+        db_manager.drop_database()
@@ -0,0 +1,62 @@
+import pandas
+import pytest
+
+import load_data
+from conftest import WEATHER_DATA_2020
+
+
+# The load_data implementation before the keyed merge (one masked assignment per 06:00 row)
+def original_load_data(file_path):
+    weather_data = pandas.read_csv(file_path)
+
+    # Replace missing values with NULL
+    weather_data = weather_data.fillna("NULL")
+
+    # Replace -1 in rain and snow with 0
+    weather_data["rain"] = weather_data["rain"].replace(-1, 0)
+    weather_data["snow"] = weather_data["snow"].replace(-1, 0)
+
+    # Get all records with time = 06:00
+    time_06 = weather_data[weather_data["time"] == "06:00"]
+
+    # Assign ground temperature to that day
+    for index, row in time_06.iterrows():
+        weather_data.loc[
+            (weather_data["day"] == row["day"])
+            & (weather_data["month"] == row["month"])
+            & (weather_data["year"] == row["year"])
+            & (weather_data["place"] == row["place"]),
+            "ground_temperature",
+        ] = row["ground_temperature"]
+
+    # Drop the records with time = 06:00
+    weather_data = weather_data[weather_data["time"] != "06:00"]
+
+    weather_data.to_csv("weather_data_sanitized.csv", index=False)
+    return weather_data
+
+
+@pytest.fixture(scope="module")
+def original(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("original")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(directory)
+        weather_data = original_load_data(WEATHER_DATA_2020)
+    return weather_data, (directory / "weather_data_sanitized.csv").read_bytes()
+
+
+def test_load_data_matches_original(original, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    weather_data = load_data.load_data(WEATHER_DATA_2020)
+    expected, expected_csv = original
+    pandas.testing.assert_frame_equal(weather_data, expected)
+    assert (tmp_path / "weather_data_sanitized.csv").read_bytes() == expected_csv
+
+
+def test_load_data_chunks_matches_original(original, tmp_path):
+    output_path = tmp_path / "sanitized.csv"
+    chunks = list(load_data.load_data_chunks(WEATHER_DATA_2020, chunk_size=500, output_path=output_path))
+    expected, expected_csv = original
+    # The chunks are numbered from 0 each
+    pandas.testing.assert_frame_equal(pandas.concat(chunks, ignore_index=True), expected.reset_index(drop=True))
+    assert output_path.read_bytes() == expected_csv
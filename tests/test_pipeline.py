@@ -0,0 +1,79 @@
+import contextlib
+import io
+
+import pandas
+import pytest
+from sqlalchemy.sql import text
+
+import db
+import load_data
+import pipeline
+from conftest import WEATHER_DATA_2020
+
+BATCH_SIZE = 500
+
+
+# Run the pipeline on the 2020 file into a new database
+def run(dsn):
+    with contextlib.redirect_stdout(io.StringIO()):
+        db_manager = db.DBManager(None, dsn)
+        db_manager.init_db_connection()
+        db_manager.engine.dispose()
+        return pipeline.run_pipeline(WEATHER_DATA_2020, dsn, batch_size=BATCH_SIZE)
+
+
+# Row counts, checkpoints and aggregates of a loaded database
+def load_state(db_manager):
+    input_key = f"{load_data.file_digest(WEATHER_DATA_2020)}-v{load_data.SANITATION_VERSION}"
+    counts = {
+        table: int(db_manager.fetch(text(f"SELECT COUNT(*) AS n FROM {table}"))["n"][0])
+        for table in ["place", "observation", "temperature"]
+    }
+    checkpoints = {
+        stage: (state["rows"], state["done"]) for stage, state in db_manager.load_checkpoints(input_key).items()
+    }
+    monthly_summary = db_manager.fetch(text("SELECT * FROM monthly_summary ORDER BY place, year, month"))
+    correlation_stats = db_manager.fetch(text("SELECT * FROM correlation_stats ORDER BY source, place"))
+    return counts, checkpoints, monthly_summary, correlation_stats
+
+
+# A load that fails in the middle of the observation COPY resumes after its last committed batch and ends
+# with the same tables as a load that did not fail
+def test_resume_after_a_failed_batch(test_dsn, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    clean = run(test_dsn.set(database=f"{test_dsn.database}_pipeline_clean"))
+    resumed = None
+    interrupted = []
+    try:
+        save_checkpoint = db.DBManager.save_checkpoint
+
+        # Fail before the third observation batch commits
+        def failing_save_checkpoint(self, input_key, stage, *args, **kwargs):
+            if stage == "observation" and kwargs.get("cursor") is not None:
+                interrupted.append(self)
+                if len(interrupted) == 3:
+                    raise RuntimeError("connection lost")
+            return save_checkpoint(self, input_key, stage, *args, **kwargs)
+
+        dsn = test_dsn.set(database=f"{test_dsn.database}_pipeline")
+        with monkeypatch.context() as failing:
+            failing.setattr(db.DBManager, "save_checkpoint", failing_save_checkpoint)
+            with pytest.raises(RuntimeError):
+                run(dsn)
+        counts, checkpoints, _, _ = load_state(interrupted[0])
+        interrupted[0].engine.dispose()
+        assert counts["observation"] == 2 * BATCH_SIZE
+        assert checkpoints["observation"] == (2 * BATCH_SIZE, False)
+        assert "temperature" not in checkpoints
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            resumed = pipeline.run_pipeline(WEATHER_DATA_2020, dsn, batch_size=BATCH_SIZE)
+        expected, actual = load_state(clean), load_state(resumed)
+        assert actual[:2] == expected[:2]
+        assert all(done for _, done in actual[1].values())
+        pandas.testing.assert_frame_equal(actual[2], expected[2])
+        pandas.testing.assert_frame_equal(actual[3], expected[3], rtol=1e-9)
+    finally:
+        clean.drop_database()
+        if resumed is not None or interrupted:
+            (resumed or interrupted[0]).drop_database()
@@ -0,0 +1,12 @@
+import benchmark
+
+
+# python app.py --help must not import the heavy modules, they are imported by the commands that need them
+def test_help_does_not_import_heavy_modules():
+    _, imported = benchmark.startup_imports()
+    assert not imported & set(benchmark.HEAVY_MODULES)
+
+
+def test_help_import_time_within_budget():
+    seconds, _ = benchmark.startup_imports()
+    assert seconds <= benchmark.STARTUP_BUDGET_SECONDS
@@ -0,0 +1,106 @@
+import contextlib
+import io
+
+import pandas
+import pytest
+
+import load_data
+import validate
+from conftest import WEATHER_DATA_2020
+
+
+# Write the 2020 file with some cells replaced, as text
+def write_bad_file(path, cells):
+    weather_data = pandas.read_csv(WEATHER_DATA_2020, dtype=str, keep_default_na=False)
+    for (row, column), value in cells.items():
+        weather_data.loc[row, column] = value
+    weather_data.to_csv(path, index=False)
+
+
+# A bad cell rejects its own row only, the rest of its column is sanitized as usual
+@pytest.mark.parametrize("typed", [False, True])
+def test_bad_cell_rejects_its_row(typed, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_bad_file(tmp_path / "bad.csv", {(4, "rain"): "abc", (7, "year"): "20x0"})
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = load_data.load_data(WEATHER_DATA_2020, typed)
+        weather_data, rejects = load_data.load_checked(tmp_path / "bad.csv", typed)
+
+    assert list(rejects["reason"]) == ["rain is not a number", "year is not a number; invalid date"]
+    # Row 4 is the 00:00 row of January 3rd, row 7 the 06:00 row of January 4th
+    expected = expected.drop(index=4).assign(
+        ground_temperature=expected["ground_temperature"].mask(expected.index == 6, float("nan"))
+    )
+    if not typed:
+        expected["ground_temperature"] = expected["ground_temperature"].fillna("NULL")
+    pandas.testing.assert_frame_equal(weather_data, expected)
+
+
+def test_missing_column_is_reported():
+    with pytest.raises(ValueError, match="Missing columns: rain"):
+        load_data.sanitize_checked(pandas.read_csv(WEATHER_DATA_2020).drop(columns=["rain"]))
+
+
+# The sanitized 2020 file (module-wide, copied by every test)
+@pytest.fixture(scope="module", params=[False, True], ids=["default", "typed"])
+def sanitized(request, tmp_path_factory):
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(tmp_path_factory.mktemp("sanitized"))
+        return load_data.load_data(WEATHER_DATA_2020, request.param)
+
+
+# Validate quietly, returning the clean rows and the reasons of the rejected rows by index
+def validate_quietly(weather_data, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        clean, rejects = validate.validate_data(weather_data, **kwargs)
+    return clean, rejects["reason"].to_dict()
+
+
+def test_clean_file_passes(sanitized):
+    clean, reasons = validate_quietly(sanitized)
+    assert reasons == {}
+    pandas.testing.assert_frame_equal(clean, sanitized)
+
+
+def test_values_out_of_range_are_rejected(sanitized):
+    weather_data = sanitized.copy()
+    rows = weather_data.index[[3, 10]]
+    weather_data.loc[rows[0], "rain"] = 600
+    weather_data.loc[rows[1], "air_temperature"] = -80
+    weather_data.loc[rows[1], "latitude"] = 91
+    clean, reasons = validate_quietly(weather_data)
+    assert reasons == {
+        rows[0]: "rain out of range",
+        rows[1]: "air_temperature out of range; latitude out of range",
+    }
+    pandas.testing.assert_frame_equal(clean, weather_data.drop(index=rows))
+
+
+def test_lowest_above_highest_is_rejected(sanitized):
+    weather_data = sanitized.copy()
+    row = weather_data.index[5]
+    weather_data.loc[row, ["lowest_temperature", "highest_temperature"]] = [4.5, -2.0]
+    _, reasons = validate_quietly(weather_data)
+    assert reasons == {row: "lowest_temperature above highest_temperature"}
+
+
+# A repeated place code and date rejects the later row, whatever its values, and keeps the first one
+def test_duplicate_keeps_the_first_row(sanitized):
+    repeated = sanitized.iloc[[7]].rename(index={sanitized.index[7]: sanitized.index.max() + 1})
+    repeated.loc[:, "snow"] = 12
+    weather_data = pandas.concat([sanitized, repeated])
+    clean, reasons = validate_quietly(weather_data)
+    assert reasons == {repeated.index[0]: "duplicate place code and date"}
+    pandas.testing.assert_frame_equal(clean, sanitized)
+
+
+# known_places holds place codes as stored (text) or as numbers
+@pytest.mark.parametrize("as_text", [False, True])
+def test_unknown_places_are_rejected(sanitized, as_text):
+    codes = sorted(pandas.to_numeric(sanitized["place_code"].astype(object)).unique())
+    known = {str(code) if as_text else code for code in codes[1:]}
+    clean, reasons = validate_quietly(sanitized, known_places=known)
+    unknown = pandas.to_numeric(sanitized["place_code"].astype(object)) == codes[0]
+    assert set(reasons) == set(sanitized.index[unknown])
+    assert set(reasons.values()) == {"unknown place code"}
+    pandas.testing.assert_frame_equal(clean, sanitized[~unknown])
@@ -0,0 +1,130 @@
+import os
+
+import pandas
+
+import load_data
+
+# Columns every sanitized frame must have (see load_data.sanitize_data)
+REQUIRED_COLUMNS = list(load_data.TYPED_DTYPES)
+
+# Measurement columns: a number, or missing ("NULL" in the default load_data mode)
+MEASUREMENT_COLUMNS = [
+    "rain",
+    "snow",
+    "air_temperature",
+    "ground_temperature",
+    "highest_temperature",
+    "lowest_temperature",
+]
+
+# Plausible range (inclusive) of the numeric columns; the extremes ever observed in Finland are well inside
+VALUE_RANGES = {
+    "rain": (0, 500),  # mm per day
+    "snow": (0, 1000),  # snow depth in cm
+    "air_temperature": (-70, 50),
+    "ground_temperature": (-70, 70),
+    "highest_temperature": (-70, 50),
+    "lowest_temperature": (-70, 50),
+    "latitude": (-90, 90),
+    "longitude": (-180, 180),
+}
+
+
+# Check the raw rows of a CSV file (pandas.read_csv) cell by cell before they are sanitized
+# (load_data.sanitize_checked), so that a bad cell only costs its own row and not the type of its column:
+# - the required columns exist (otherwise ValueError, the file cannot be loaded at all)
+# - measurements, coordinates, year, month and day are numbers (or missing)
+# - year, month and day form a calendar date
+# Returns the passing rows, with those columns converted to numbers (year, month and day to int64), and the
+# rejected rows as read, with a "reason" column listing every failed check (see validate_data).
+def check_raw(weather_data):
+    missing = [column for column in REQUIRED_COLUMNS if column not in weather_data]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    checks = {}
+    numbers = {}
+    for column in MEASUREMENT_COLUMNS + ["latitude", "longitude", "year", "month", "day"]:
+        numbers[column] = pandas.to_numeric(weather_data[column], errors="coerce")
+        checks[f"{column} is not a number"] = weather_data[column].notna() & numbers[column].isna()
+    parts = pandas.DataFrame({part: numbers[part] for part in ["year", "month", "day"]})
+    checks["invalid date"] = pandas.to_datetime(parts, errors="coerce").isna() | parts.ne(parts.round()).any(axis=1)
+
+    failed = pandas.DataFrame(checks)
+    rejected = failed.any(axis=1)
+    rejects = weather_data[rejected].assign(reason=_reasons(failed[rejected]))
+    weather_data = weather_data[~rejected].assign(
+        **{column: values[~rejected] for column, values in numbers.items()}
+    ).astype({part: "int64" for part in ["year", "month", "day"]})
+    return weather_data, rejects
+
+
+# Validate sanitized data (load_data.load_data, default or typed mode) before it is loaded. Every check
+# runs over whole columns:
+# - the required columns exist (otherwise ValueError, the file cannot be loaded at all)
+# - measurements and coordinates are numbers (or missing) inside VALUE_RANGES, the lowest temperature
+#   is not above the highest
+# - year, month and day form a calendar date
+# - the place code is an integer, and one of known_places when given (e.g. the codes of the place table)
+# - no other row has the same place code and date (the first one is kept)
+# Returns the clean rows and the rejected rows, the latter with a "reason" column listing every failed
+# check. rejects are rows already rejected before sanitation (see check_raw), they come first among the
+# rejected rows. With reject_path the rejected rows are also written to that CSV file.
+def validate_data(weather_data, known_places=None, reject_path=None, rejects=None):
+    missing = [column for column in REQUIRED_COLUMNS if column not in weather_data]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    checks = {}
+    values = {}
+    for column in MEASUREMENT_COLUMNS + ["latitude", "longitude"]:
+        raw = load_data.nulls(weather_data[column])
+        values[column] = pandas.to_numeric(raw, errors="coerce").astype("float64")
+        checks[f"{column} is not a number"] = raw.notna() & values[column].isna()
+        if column in ["latitude", "longitude"]:
+            checks[f"{column} is missing"] = raw.isna()
+        low, high = VALUE_RANGES[column]
+        checks[f"{column} out of range"] = (values[column] < low) | (values[column] > high)
+    checks["lowest_temperature above highest_temperature"] = (
+        values["lowest_temperature"] > values["highest_temperature"]
+    )
+
+    parts = {part: pandas.to_numeric(load_data.nulls(weather_data[part]), errors="coerce") for part in ["year", "month", "day"]}
+    dates = pandas.to_datetime(pandas.DataFrame(parts), errors="coerce")
+    integral = pandas.DataFrame(parts).eq(pandas.DataFrame(parts).round()).all(axis=1)
+    checks["invalid date"] = dates.isna() | ~integral
+
+    codes = pandas.to_numeric(load_data.nulls(weather_data["place_code"].astype(object)), errors="coerce")
+    checks["invalid place code"] = codes.isna() | codes.ne(codes.round())
+    if known_places is not None:
+        known = pandas.to_numeric(pandas.Series(list(known_places), dtype=object), errors="coerce")
+        checks["unknown place code"] = codes.notna() & ~codes.isin(known)
+
+    # Among rows with a valid key, every repetition of a (place code, date) after the first one
+    keyed = ~(checks["invalid date"] | checks["invalid place code"])
+    duplicated = pandas.DataFrame({"place_code": codes, "date": dates})[keyed].duplicated()
+    checks["duplicate place code and date"] = duplicated.reindex(weather_data.index, fill_value=False)
+
+    failed = pandas.DataFrame(checks)
+    rejected = failed.any(axis=1)
+    clean = weather_data[~rejected]
+    total = len(weather_data)
+    if rejects is not None and len(rejects):
+        total += len(rejects)
+        rejects = pandas.concat([rejects, weather_data[rejected].assign(reason=_reasons(failed[rejected]))])
+    else:
+        rejects = weather_data[rejected].assign(reason=_reasons(failed[rejected]))
+
+    if reject_path is not None:
+        os.makedirs(os.path.dirname(reject_path) or ".", exist_ok=True)
+        rejects.to_csv(reject_path, index=False)
+    if len(rejects):
+        print(f"Rejected {len(rejects)} of {total} rows" + (f" (see {reject_path})" if reject_path else ""))
+        print(rejects["reason"].str.split("; ").explode().value_counts().to_string())
+    return clean, rejects
+
+
+# The reasons of every row of a frame of failed checks: the names of its failed checks, joined with "; "
+def _reasons(failed):
+    return failed.dot(pandas.Index([f"{name}; " for name in failed.columns])).str[:-2]
+